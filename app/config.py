@@ -9,10 +9,97 @@ DEBUG_LOGGING = DEBUG_LOGGING_ENV.lower() == "true"
 
 # --- Transcription Engine Configuration ---
 TRANSCRIPTION_ENGINE = os.getenv("TRANSCRIPTION_ENGINE", "faster-whisper").lower()
+# faster-whisper also accepts a Hugging Face repo id or local path of a CTranslate2 conversion, e.g. a
+# checkpoint pre-quantized with `ct2-transformers-converter --quantization int8` to shrink download and load time.
+# Standard names are quantized at load time according to COMPUTE_TYPE.
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base") # Used by both engines
-DEVICE = os.getenv("DEVICE", "cpu") # Used by both engines
+DEVICE = os.getenv("DEVICE", "auto").lower() # Used by both engines
+if DEVICE == "auto": # entrypoint.sh normally resolves this already; fall back to looking for an NVIDIA device node
+    DEVICE = "cuda" if TRANSCRIPTION_ENGINE != "whisper.cpp" and Path("/dev/nvidiactl").exists() else "cpu"
 # faster-whisper specific
-COMPUTE_TYPE = os.getenv("COMPUTE_TYPE", "default") # Only for faster-whisper
+COMPUTE_TYPE_ENV = os.getenv("COMPUTE_TYPE", "default") # Only for faster-whisper
+# "default" picks int8 on CPU; on CUDA, "auto" lets CTranslate2 choose the fastest type the GPU supports
+# (int8_float16 on Turing and newer, something slower but working on e.g. Pascal)
+if COMPUTE_TYPE_ENV.lower() == "default":
+    COMPUTE_TYPE = "auto" if DEVICE == "cuda" else "int8"
+else:
+    COMPUTE_TYPE = COMPUTE_TYPE_ENV
+
+# Podcast-tuned decoding: independent 30s windows (no repetition loops carried across windows) and
+# Silero VAD to skip intros/outros/pauses. VAD only applies to faster-whisper.
+CONDITION_ON_PREVIOUS_TEXT = os.getenv("CONDITION_ON_PREVIOUS_TEXT", "false").lower() == "true"
+# Re-decoding a window at rising temperatures when it looks like a hallucination can multiply runtime on
+# hard segments; off by default so every window is decoded exactly once at temperature 0.
+TEMPERATURE_FALLBACK = os.getenv("TEMPERATURE_FALLBACK", "false").lower() == "true"
+VAD_FILTER = os.getenv("VAD_FILTER", "true").lower() == "true"
+VAD_MIN_SILENCE_MS_ENV = os.getenv("VAD_MIN_SILENCE_MS", "500")
+try:
+    VAD_MIN_SILENCE_MS = int(VAD_MIN_SILENCE_MS_ENV)
+except ValueError:
+    logging.warning(f"Invalid VAD_MIN_SILENCE_MS: {VAD_MIN_SILENCE_MS_ENV}. Defaulting to 500.")
+    VAD_MIN_SILENCE_MS = 500
+
+# Release model weights from VRAM/RAM while sleeping between cycles (for shared GPUs); reloaded on the next transcription
+IDLE_UNLOAD = os.getenv("IDLE_UNLOAD", "false").lower() == "true"
+
+# whisper.cpp specific: GGML quantization suffix of the model file (e.g. q5_0, q5_1, q8_0); empty = unquantized
+WHISPER_CPP_QUANTIZATION = os.getenv("WHISPER_CPP_QUANTIZATION", "q8_0").strip()
+
+BATCH_SIZE_ENV = os.getenv("BATCH_SIZE", "default") # Only for faster-whisper; >1 batches 30s windows through the model
+if BATCH_SIZE_ENV.lower() == "default":
+    BATCH_SIZE = 16 if DEVICE == "cuda" else 1 # Batching mainly pays off when the GPU would otherwise sit idle
+else:
+    try:
+        BATCH_SIZE = max(1, int(BATCH_SIZE_ENV))
+    except ValueError:
+        logging.warning(f"Invalid BATCH_SIZE: {BATCH_SIZE_ENV}. Defaulting to 1 (no batching).")
+        BATCH_SIZE = 1
+
+def _cgroup_cpu_limit():
+    """Returns the container's cgroup v2 CPU quota rounded up to whole CPUs, or None if unlimited/unknown."""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        if quota == "max":
+            return None
+        return max(1, -(-int(quota) // int(period)))
+    except (OSError, ValueError):
+        return None
+
+def _physical_core_count():
+    """Counts distinct physical cores among the CPUs this process may run on (SMT siblings count once),
+    capped by the cgroup CPU quota (e.g. docker --cpus), which sched_getaffinity does not reflect."""
+    try:
+        cpus = os.sched_getaffinity(0)
+    except AttributeError:
+        cpus = range(os.cpu_count() or 4)
+    cores = set()
+    for cpu in cpus:
+        topology = Path(f"/sys/devices/system/cpu/cpu{cpu}/topology")
+        try:
+            cores.add(((topology / "physical_package_id").read_text().strip(), (topology / "core_id").read_text().strip()))
+        except OSError:
+            cores = None # No topology info (e.g. some sandboxes); fall back to logical CPUs
+            break
+    count = len(cores) if cores else len(cpus)
+    cpu_limit = _cgroup_cpu_limit()
+    return min(count, cpu_limit) if cpu_limit else count
+
+CPU_THREADS_ENV = os.getenv("CPU_THREADS", "0") # For faster-whisper and whisper.cpp; 0 = one thread per physical core
+try:
+    CPU_THREADS = int(CPU_THREADS_ENV)
+except ValueError:
+    logging.warning(f"Invalid CPU_THREADS: {CPU_THREADS_ENV}. Defaulting to 0 (all physical cores).")
+    CPU_THREADS = 0
+if CPU_THREADS <= 0:
+    # Inference GEMMs saturate a core's FPUs; a second thread on its SMT sibling only adds contention
+    CPU_THREADS = _physical_core_count()
+
+BEAM_SIZE_ENV = os.getenv("BEAM_SIZE", "1") # 1 = greedy decoding; near-identical WER on long-form speech
+try:
+    BEAM_SIZE = max(1, int(BEAM_SIZE_ENV))
+except ValueError:
+    logging.warning(f"Invalid BEAM_SIZE: {BEAM_SIZE_ENV}. Defaulting to 1.")
+    BEAM_SIZE = 1
 
 # --- Podcast Feed Configuration ---
 PODCAST_FEEDS_ENV = os.getenv("PODCAST_FEEDS", "")
@@ -40,7 +127,7 @@ KEEP_MP3 = KEEP_MP3_ENV.lower() == "true"
 # --- Import Folder Configuration ---
 IMPORT_DIR_ENV = os.getenv("IMPORT_DIR", "")
 IMPORT_DIR = Path(IMPORT_DIR_ENV) if IMPORT_DIR_ENV else None
-SUPPORTED_IMPORT_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.flac', '.ogg', '.aac', '.opus']
+SUPPORTED_IMPORT_EXTENSIONS = frozenset({'.mp3', '.wav', '.m4a', '.flac', '.ogg', '.aac', '.opus'})
 
 IMPORT_CHECK_INTERVAL_SECONDS_ENV = os.getenv("IMPORT_CHECK_INTERVAL_SECONDS", "60")
 try:
@@ -53,7 +140,9 @@ except ValueError:
 OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", "/out")) # Allow overriding /out if needed, though typically fixed by Docker volume
 TRANSCRIPTS_DIR = OUTPUT_DIR / "transcripts"
 MP3_DIR = OUTPUT_DIR / "mp3" # For podcast downloads if KEEP_MP3 is true
-STATE_FILE = OUTPUT_DIR / ".processed_episodes.log" # For podcast episodes
+STATE_FILE = OUTPUT_DIR / ".processed_episodes.bin" # For podcast episodes: packed 64-bit GUID hashes
+LEGACY_STATE_FILE = OUTPUT_DIR / ".processed_episodes.log" # Pre-hashing GUID log, migrated on first start
+FEED_CACHE_FILE = OUTPUT_DIR / ".feed_cache.json" # ETag/Last-Modified per feed for conditional GETs
 
 # --- Notification Configuration ---
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL", "")
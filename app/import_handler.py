@@ -1,7 +1,9 @@
 # app/import_handler.py
 import logging
+import os
 from pathlib import Path
 import shutil
+import time as time_module
 
 import config # For IMPORT_DIR, SUPPORTED_IMPORT_EXTENSIONS, TRANSCRIPTS_DIR, DISCORD_WEBHOOK_URL
 import utils # For sanitize_filename
@@ -9,12 +11,125 @@ import utils # For sanitize_filename
 
 logger = logging.getLogger(__name__)
 
+_inotify_simple = None
+try:
+    import inotify_simple as _inotify_simple_imported
+    _inotify_simple = _inotify_simple_imported
+except ImportError:
+    logger.debug("inotify_simple not installed; import folder will be polled.")
+
+# Filesystems on which inotify does not see writes made by other hosts/VMs
+NETWORK_FILESYSTEM_TYPES = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'fuse.sshfs'}
+
+def _get_filesystem_type(path: Path):
+    """Returns the filesystem type of the mount containing path, per /proc/mounts."""
+    try:
+        resolved = str(path.resolve())
+        best_mount, best_type = "", None
+        with open("/proc/mounts", 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point, fs_type = fields[1], fields[2]
+                if (resolved == mount_point or resolved.startswith(mount_point.rstrip('/') + '/')) \
+                        and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fs_type
+        return best_type
+    except OSError as e:
+        logger.debug(f"Could not determine filesystem type for {path}: {e}")
+        return None
+
+def create_import_watcher():
+    """Creates an inotify watcher on IMPORT_DIR, or returns None to fall back to polling."""
+    if not config.IMPORT_DIR or not config.IMPORT_DIR.is_dir():
+        return None
+    if not _inotify_simple:
+        logger.info("inotify_simple not available. Polling import folder instead.")
+        return None
+
+    fs_type = _get_filesystem_type(config.IMPORT_DIR)
+    if fs_type in NETWORK_FILESYSTEM_TYPES:
+        logger.info(f"Import directory is on a '{fs_type}' filesystem where inotify is unreliable. Polling instead.")
+        return None
+
+    try:
+        watcher = _inotify_simple.INotify()
+        watcher.add_watch(str(config.IMPORT_DIR), _inotify_simple.flags.CLOSE_WRITE | _inotify_simple.flags.MOVED_TO)
+        logger.info(f"Watching import directory {config.IMPORT_DIR} for new files with inotify.")
+        return watcher
+    except OSError as e:
+        logger.warning(f"Failed to set up inotify watch on {config.IMPORT_DIR}: {e}. Polling instead.")
+        return None
+
+# Names process_import_folder moved back after a failed transcription; their MOVED_TO events are not new files
+_returned_import_names = set()
+
+def _is_new_import_event(event) -> bool:
+    if os.path.splitext(event.name)[1].lower() not in config.SUPPORTED_IMPORT_EXTENSIONS:
+        return False
+    if event.name in _returned_import_names:
+        _returned_import_names.discard(event.name)
+        return False
+    return True
+
+def wait_for_import_files(watcher, timeout_seconds: float) -> bool:
+    """
+    Blocks for up to timeout_seconds. Returns True as soon as a supported audio file
+    lands in IMPORT_DIR, or False once the timeout expires. Without a watcher this is a plain sleep.
+    """
+    if not watcher:
+        time_module.sleep(timeout_seconds)
+        return False
+
+    deadline = time_module.monotonic() + timeout_seconds
+    while True:
+        remaining = deadline - time_module.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            events = watcher.read(timeout=int(remaining * 1000))
+        except OSError as e:
+            logger.error(f"Error reading inotify events for import directory: {e}. Sleeping instead.")
+            time_module.sleep(max(0, deadline - time_module.monotonic()))
+            return False
+        for event in events:
+            if _is_new_import_event(event):
+                logger.info(f"Import file detected: {event.name}")
+                return True
+
+def discard_pending_import_events(watcher) -> bool:
+    """
+    Drops queued events. Returns True if any of them announced a new supported audio file
+    (events caused by process_import_folder moving failed files back do not count).
+    """
+    if not watcher:
+        return False
+    try:
+        events = watcher.read(timeout=0)
+    except OSError:
+        return False
+    new_files = [event.name for event in events if _is_new_import_event(event)]
+    if new_files:
+        logger.info(f"Import file(s) arrived while processing: {', '.join(new_files)}")
+    return bool(new_files)
+
+# Whether IMPORT_DIR and its processing dir share a device; determined once on first use
+_same_fs = None
+
+def _move_file(src: Path, dst: Path):
+    """Moves src to dst with a single atomic rename when both are on the same filesystem."""
+    if _same_fs:
+        os.replace(src, dst)
+    else:
+        shutil.move(str(src), str(dst))
+
 def process_import_folder(
         transcription_model,
         transcribe_audio_func, # Function reference, e.g., transcription.transcribe_audio
         send_to_discord_func   # Function reference, e.g., notifications.send_to_discord
     ):
-    if not config.IMPORT_DIR or not config.IMPORT_DIR.exists() or not config.IMPORT_DIR.is_dir():
+    if not config.IMPORT_DIR or not config.IMPORT_DIR.is_dir():
         if config.IMPORT_DIR_ENV:
             logger.warning(f"Import directory '{config.IMPORT_DIR_ENV}' not found or not a directory. Skipping.")
         return 0
@@ -25,52 +140,69 @@ def process_import_folder(
     processing_temp_dir = config.IMPORT_DIR / ".processing_tmp"
     processing_temp_dir.mkdir(exist_ok=True)
 
-    for item in config.IMPORT_DIR.iterdir():
-        if item.is_file() and item.suffix.lower() in config.SUPPORTED_IMPORT_EXTENSIONS:
-            logger.info(f"Found import file: {item.name}")
-            
-            temp_audio_path = processing_temp_dir / item.name
+    global _same_fs
+    if _same_fs is None:
+        try:
+            _same_fs = os.stat(config.IMPORT_DIR).st_dev == os.stat(processing_temp_dir).st_dev
+            logger.debug(f"Import directory and processing directory on same filesystem: {_same_fs}")
+        except OSError as e:
+            logger.warning(f"Could not compare filesystems for import directories: {e}. Using shutil.move.")
+            _same_fs = False
+
+    # scandir's DirEntry caches the file type from the directory listing, so no per-file stat is needed
+    with os.scandir(config.IMPORT_DIR) as entries:
+        import_files = [Path(entry.path) for entry in entries
+                        if entry.is_file()
+                        and os.path.splitext(entry.name)[1].lower() in config.SUPPORTED_IMPORT_EXTENSIONS]
+
+    existing_transcripts = utils.list_filenames(config.TRANSCRIPTS_DIR)
+
+    for item in import_files:
+        logger.info(f"Found import file: {item.name}")
+        
+        temp_audio_path = processing_temp_dir / item.name
+        try:
+            _move_file(item, temp_audio_path)
+        except Exception as e:
+            logger.error(f"Failed to move import file {item.name} to processing dir: {e}. Skipping.")
+            continue
+
+        original_file_title = temp_audio_path.stem
+        transcript_filename_base = utils.sanitize_filename(original_file_title)
+        final_transcript_txt_path = config.TRANSCRIPTS_DIR / f"{transcript_filename_base}.txt"
+
+        if final_transcript_txt_path.name in existing_transcripts:
+            logger.warning(f"Transcript for imported file '{temp_audio_path.name}' already exists. Deleting imported audio.")
+            try: temp_audio_path.unlink()
+            except OSError as e: logger.error(f"Error deleting already processed imported audio {temp_audio_path.name}: {e}")
+            continue
+
+        logger.info(f"Processing imported file: {temp_audio_path.name}")
+
+        success = transcribe_audio_func(
+            transcription_model,
+            temp_audio_path,
+            final_transcript_txt_path
+        )
+        
+        if success:
+            logger.info(f"Successfully transcribed imported file: {temp_audio_path.name} to {final_transcript_txt_path}")
+            existing_transcripts.add(final_transcript_txt_path.name)
+            if config.DISCORD_WEBHOOK_URL:
+                send_to_discord_func(config.DISCORD_WEBHOOK_URL, final_transcript_txt_path, original_file_title)
+            try:
+                temp_audio_path.unlink()
+                logger.info(f"Deleted imported audio file: {temp_audio_path.name} after processing.")
+            except OSError as e:
+                logger.error(f"Error deleting imported audio file {temp_audio_path.name}: {e}")
+            processed_count += 1
+        else:
+            logger.error(f"Failed to transcribe imported file: {temp_audio_path.name}. Moving it back to import root.")
             try:
-                shutil.move(str(item), str(temp_audio_path))
+                _move_file(temp_audio_path, config.IMPORT_DIR / temp_audio_path.name)
+                _returned_import_names.add(temp_audio_path.name)
             except Exception as e:
-                logger.error(f"Failed to move import file {item.name} to processing dir: {e}. Skipping.")
-                continue
-
-            original_file_title = temp_audio_path.stem
-            transcript_filename_base = utils.sanitize_filename(original_file_title)
-            final_transcript_txt_path = config.TRANSCRIPTS_DIR / f"{transcript_filename_base}.txt"
-
-            if final_transcript_txt_path.exists():
-                logger.warning(f"Transcript for imported file '{temp_audio_path.name}' already exists. Deleting imported audio.")
-                try: temp_audio_path.unlink()
-                except OSError as e: logger.error(f"Error deleting already processed imported audio {temp_audio_path.name}: {e}")
-                continue
-
-            logger.info(f"Processing imported file: {temp_audio_path.name}")
-            config.TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
-
-            success = transcribe_audio_func(
-                transcription_model,
-                temp_audio_path,
-                final_transcript_txt_path
-            )
-            
-            if success:
-                logger.info(f"Successfully transcribed imported file: {temp_audio_path.name} to {final_transcript_txt_path}")
-                if config.DISCORD_WEBHOOK_URL:
-                    send_to_discord_func(config.DISCORD_WEBHOOK_URL, final_transcript_txt_path, original_file_title)
-                try:
-                    temp_audio_path.unlink()
-                    logger.info(f"Deleted imported audio file: {temp_audio_path.name} after processing.")
-                except OSError as e:
-                    logger.error(f"Error deleting imported audio file {temp_audio_path.name}: {e}")
-                processed_count += 1
-            else:
-                logger.error(f"Failed to transcribe imported file: {temp_audio_path.name}. Moving it back to import root.")
-                try:
-                    shutil.move(str(temp_audio_path), str(config.IMPORT_DIR / temp_audio_path.name))
-                except Exception as e:
-                    logger.error(f"Could not move failed import {temp_audio_path.name} back to root: {e}.")
+                logger.error(f"Could not move failed import {temp_audio_path.name} back to root: {e}.")
     try:
         if not any(processing_temp_dir.iterdir()):
             processing_temp_dir.rmdir()
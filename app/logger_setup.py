@@ -1,6 +1,5 @@
 # app/logger_setup.py
 import logging
-import os
 import sys
 import config # Import from our config module
 
@@ -10,9 +9,7 @@ def setup_logging():
     logging.basicConfig(level=log_level,
                         format='%(asctime)s - %(levelname)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s',
                         stream=sys.stdout)
-    
-    # Force python stdout/stderr streams to be unbuffered
-    os.environ['PYTHONUNBUFFERED'] = '1'
+    # Unbuffered stdout comes from PYTHONUNBUFFERED in the Dockerfile; it must be set before the interpreter starts
     
     initial_logger = logging.getLogger(__name__)
     initial_logger.info(f"Logging initialized. Debug logging enabled: {config.DEBUG_LOGGING}")
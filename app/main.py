@@ -4,8 +4,7 @@ import sys
 import time as time_module
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-import shutil # For moving podcast MP3s if kept
-import os # For removing podcast MP3s
+from concurrent.futures import ThreadPoolExecutor
 
 # Import from our new local modules
 import config
@@ -30,7 +29,22 @@ def ensure_directories():
         config.IMPORT_DIR.mkdir(parents=True, exist_ok=True)
     logger.info("Output and import directories ensured.")
 
-def main_loop(transcription_model_obj, processed_episode_guids_set):
+def download_and_decode_episode(url, target_path):
+    """Downloads an episode and decodes it for the engine. Returns (downloaded, audio); audio is None if decoding
+    failed, in which case the engine decodes from the file itself."""
+    if not podcast_processing.download_episode(url, target_path):
+        return False, None
+    try:
+        audio = transcription.load_audio(target_path)
+    except Exception as e:
+        logger.warning(f"Could not pre-decode {target_path}: {e}. The transcription engine will decode it instead.")
+        return True, None
+    if not isinstance(audio, str):
+        # The MP3 is fully decoded in memory and won't be read again; free its page cache for model weights
+        utils.drop_page_cache(target_path)
+    return True, audio
+
+def main_loop(transcription_model_obj, processed_episode_guids_set, import_watcher=None):
     """Main processing loop."""
     while True:
         # 1. Process Import Folder (Priority at the start of a full cycle)
@@ -39,7 +53,7 @@ def main_loop(transcription_model_obj, processed_episode_guids_set):
             import_handler.process_import_folder(
                 transcription_model_obj,
                 transcription.transcribe_audio, # Pass the main transcription function
-                notifications.send_to_discord   # Pass the notification function
+                notifications.send_to_discord_async   # Pass the notification function
             )
         
         # 2. Process Podcast Feeds
@@ -47,19 +61,39 @@ def main_loop(transcription_model_obj, processed_episode_guids_set):
             logger.info("--- Starting podcast feed check cycle ---")
             new_episodes_processed_this_cycle = 0
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=config.LOOKBACK_DAYS)
+            cutoff_tuple = tuple(cutoff_date.timetuple()[:6]) # Comparable with feedparser's UTC published_parsed
+            # One directory scan per cycle replaces a stat per new episode for duplicate-transcript checks
+            existing_transcripts = utils.list_filenames(config.TRANSCRIPTS_DIR)
             logger.info(f"Processing podcast episodes published on or after: {cutoff_date.strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-            for feed_url in config.podcast_urls:
-                logger.info(f"Checking feed: {feed_url}")
+            # Feeds are fetched concurrently; episodes are still processed one at a time below
+            for feed_url, feed in podcast_processing.fetch_feeds(config.podcast_urls):
+                if feed is None:
+                    continue # Unchanged since last cycle, or fetch failure already logged
+                feed_has_retries = False
                 try:
-                    feed = podcast_processing.feedparser.parse(feed_url) # feedparser is used within podcast_processing now
                     if feed.bozo:
                         logger.warning(f"Feed {feed_url} may be ill-formed. Reason: {feed.bozo_exception}")
-                    if feed.status not in [200, 301, 302, 304, 307, 308]: 
-                         logger.warning(f"Feed {feed_url} returned status code: {feed.status}. Skipping for this cycle.")
-                         continue
 
+                    # Collect this feed's new episodes first so the next download can overlap the current transcription
+                    pending_episodes = []
+                    pending_txt_filenames = set()
                     for entry in feed.entries:
+                        # Most entries of an established feed are already processed; skip them before date/title parsing
+                        entry_guid = podcast_processing.get_episode_guid(entry)
+                        episode_key = podcast_processing.episode_key(entry_guid) if entry_guid else None
+                        if episode_key in processed_episode_guids_set:
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(f"Episode GUID {entry_guid} already processed. Skipping.")
+                            continue
+
+                        # Cheap tuple compare rejects old entries before any datetime is built
+                        published_parsed = entry.get('published_parsed')
+                        if published_parsed and tuple(published_parsed[:6]) < cutoff_tuple:
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(f"Episode GUID {entry_guid} published {tuple(published_parsed[:6])} is older. Skipping.")
+                            continue
+
                         episode_guid, episode_title, mp3_url, filename_base, published_date = \
                             podcast_processing.get_episode_data(entry)
 
@@ -70,7 +104,8 @@ def main_loop(transcription_model_obj, processed_episode_guids_set):
                             if published_date.tzinfo is None:
                                 published_date = published_date.replace(tzinfo=timezone.utc)
                             if published_date < cutoff_date: 
-                                logger.debug(f"Episode '{episode_title}' (GUID: {episode_guid}) published {published_date} is older. Skipping.")
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug(f"Episode '{episode_title}' (GUID: {episode_guid}) published {published_date} is older. Skipping.")
                                 continue
                         elif not config.IMPORT_DIR: # Only skip if not also relying on import dir as a primary function
                             logger.warning(f"Episode '{episode_title}' (GUID: {episode_guid}) has no parsable publication date. Skipping as podcast-only mode.")
@@ -78,83 +113,113 @@ def main_loop(transcription_model_obj, processed_episode_guids_set):
                             # For strict podcast mode, uncomment below to skip if no date.
                             # continue 
                         
-                        if episode_guid in processed_episode_guids_set:
-                            logger.debug(f"Episode '{episode_title}' (GUID: {episode_guid}) already processed. Skipping.")
-                            continue
-
                         logger.info(f"New podcast episode found: '{episode_title}' (GUID: {episode_guid})")
                         
                         txt_filename = f"{filename_base}.txt"
                         final_output_txt_path = config.TRANSCRIPTS_DIR / txt_filename
 
-                        if final_output_txt_path.exists():
+                        if txt_filename in existing_transcripts:
                             logger.warning(f"Transcript for podcast episode '{episode_title}' already exists: {final_output_txt_path}. Marking as processed.")
-                            if episode_guid not in processed_episode_guids_set:
+                            if episode_key not in processed_episode_guids_set:
                                 podcast_processing.save_processed_episode(episode_guid)
-                                processed_episode_guids_set.add(episode_guid)
+                                processed_episode_guids_set.add(episode_key)
+                            continue
+                        if txt_filename in pending_txt_filenames:
+                            logger.warning(f"Episode '{episode_title}' (GUID: {episode_guid}) maps to the same transcript as another new episode. Deferring to next cycle.")
                             continue
+                        pending_txt_filenames.add(txt_filename)
 
-                        # Determine temporary MP3 path
+                        # Kept MP3s download straight to their final name; otherwise to a scratch file deleted after transcription
                         mp3_filename = f"{filename_base}.mp3"
-                        temp_mp3_dir_base = config.MP3_DIR if config.KEEP_MP3 else config.OUTPUT_DIR 
-                        temp_mp3_path = temp_mp3_dir_base / f"_temp_{mp3_filename}"
-                        temp_mp3_path.parent.mkdir(parents=True, exist_ok=True) # Ensure dir for temp_mp3
-
-                        if not podcast_processing.download_episode(mp3_url, temp_mp3_path):
-                            logger.warning(f"Download failed for '{episode_title}'. Will retry next cycle.")
-                            continue 
-                        
-                        new_episodes_processed_this_cycle += 1
-                        config.TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
-                        
-                        transcription_successful = transcription.transcribe_audio(
-                            transcription_model_obj,
-                            temp_mp3_path,
-                            final_output_txt_path
-                        )
-
-                        if not transcription_successful:
-                            logger.error(f"Transcription failed for podcast episode '{episode_title}' (GUID: {episode_guid}).")
-                            # Temp MP3 cleanup handled by download_episode on failure or below if KEEP_MP3 is false
-                            if temp_mp3_path.exists() and not config.KEEP_MP3: # ensure cleanup if transcribe failed and we're not keeping
-                                try: temp_mp3_path.unlink()
-                                except OSError as e: logger.error(f"Error removing temp MP3 {temp_mp3_path} after failed transcription: {e}")
-                            continue 
-
-                        # Handle MP3 after successful transcription
-                        final_mp3_path = config.MP3_DIR / mp3_filename
                         if config.KEEP_MP3:
-                            try:
-                                if temp_mp3_path.exists():
-                                    shutil.move(str(temp_mp3_path), str(final_mp3_path))
-                                    logger.info(f"Podcast MP3 file kept and moved to {final_mp3_path}")
-                            except Exception as e:
-                                logger.error(f"Failed to move podcast MP3 {temp_mp3_path} to {final_mp3_path}: {e}")
-                        else: # Delete MP3
-                            if temp_mp3_path.exists():
-                                try:
-                                    temp_mp3_path.unlink() # Replaced os.remove
-                                    logger.info(f"Successfully deleted podcast MP3: {temp_mp3_path}")
-                                except OSError as e:
-                                    logger.error(f"Failed to delete podcast MP3 file {temp_mp3_path}: {e}")
-                        
-                        notifications.send_to_discord(config.DISCORD_WEBHOOK_URL, final_output_txt_path, episode_title)
-                        podcast_processing.save_processed_episode(episode_guid)
-                        processed_episode_guids_set.add(episode_guid)
-                        logger.info(f"Successfully processed podcast episode: '{episode_title}' (GUID: {episode_guid})")
-
-                        # Check import folder after processing this podcast episode
-                        if config.IMPORT_DIR and transcription_model_obj:
-                            logger.info(f"--- Checking import folder (after podcast episode: {episode_title}) ---")
-                            import_handler.process_import_folder(
+                            mp3_path = config.MP3_DIR / mp3_filename
+                        else:
+                            mp3_path = config.OUTPUT_DIR / f"_temp_{mp3_filename}"
+
+                        pending_episodes.append((episode_guid, episode_key, episode_title, mp3_url,
+                                                 mp3_path, final_output_txt_path))
+
+                    # A single background slot: episode N+1 downloads and decodes while episode N is transcribed
+                    with ThreadPoolExecutor(max_workers=1) as downloader:
+                        next_download = None
+                        if pending_episodes:
+                            next_download = downloader.submit(download_and_decode_episode,
+                                                              pending_episodes[0][3], pending_episodes[0][4])
+
+                        for index, (episode_guid, episode_key, episode_title, mp3_url,
+                                    mp3_path, final_output_txt_path) in enumerate(pending_episodes):
+                            download_successful, decoded_audio = next_download.result()
+                            next_download = None
+                            if index + 1 < len(pending_episodes):
+                                next_download = downloader.submit(download_and_decode_episode,
+                                                                  pending_episodes[index + 1][3], pending_episodes[index + 1][4])
+
+                            if not download_successful:
+                                logger.warning(f"Download failed for '{episode_title}'. Will retry next cycle.")
+                                feed_has_retries = True
+                                continue
+
+                            # An import processed since the scan above may have written this transcript name
+                            if final_output_txt_path.exists():
+                                logger.warning(f"Transcript for podcast episode '{episode_title}' already exists: {final_output_txt_path}. Marking as processed.")
+                                podcast_processing.save_processed_episode(episode_guid)
+                                processed_episode_guids_set.add(episode_key)
+                                decoded_audio = None
+                                if not config.KEEP_MP3:
+                                    try: mp3_path.unlink()
+                                    except FileNotFoundError: pass
+                                    except OSError as e: logger.error(f"Error removing temp MP3 {mp3_path}: {e}")
+                                continue
+
+                            new_episodes_processed_this_cycle += 1
+                            
+                            transcription_successful = transcription.transcribe_audio(
                                 transcription_model_obj,
-                                transcription.transcribe_audio,
-                                notifications.send_to_discord
+                                mp3_path,
+                                final_output_txt_path,
+                                decoded_audio
                             )
-                except podcast_processing.feedparser.FeedParserError as fpe: # Catch specific feedparser error
-                    logger.error(f"Error parsing feed {feed_url}: {fpe}")
-                except requests.exceptions.ConnectionError as rce:
-                    logger.error(f"Connection error for feed {feed_url}: {rce}. Will retry next cycle.")
+                            decoded_audio = None # Release the waveform before the next one is handed over
+
+                            if not transcription_successful:
+                                logger.error(f"Transcription failed for podcast episode '{episode_title}' (GUID: {episode_guid}).")
+                                # Temp MP3 cleanup handled by download_episode on failure or below if KEEP_MP3 is false
+                                if not config.KEEP_MP3: # ensure cleanup if transcribe failed and we're not keeping
+                                    try: mp3_path.unlink()
+                                    except FileNotFoundError: pass
+                                    except OSError as e: logger.error(f"Error removing temp MP3 {mp3_path} after failed transcription: {e}")
+                                feed_has_retries = True
+                                continue 
+
+                            # Handle MP3 after successful transcription
+                            if config.KEEP_MP3:
+                                logger.info(f"Podcast MP3 file kept at {mp3_path}")
+                            else: # Delete MP3
+                                try:
+                                    mp3_path.unlink() # Replaced os.remove
+                                    logger.info(f"Successfully deleted podcast MP3: {mp3_path}")
+                                except FileNotFoundError:
+                                    pass
+                                except OSError as e:
+                                    logger.error(f"Failed to delete podcast MP3 file {mp3_path}: {e}")
+                            
+                            notifications.send_to_discord_async(config.DISCORD_WEBHOOK_URL, final_output_txt_path, episode_title)
+                            podcast_processing.save_processed_episode(episode_guid)
+                            processed_episode_guids_set.add(episode_key)
+                            existing_transcripts.add(final_output_txt_path.name)
+                            logger.info(f"Successfully processed podcast episode: '{episode_title}' (GUID: {episode_guid})")
+
+                            # Check import folder after processing this podcast episode
+                            if config.IMPORT_DIR and transcription_model_obj:
+                                logger.info(f"--- Checking import folder (after podcast episode: {episode_title}) ---")
+                                import_handler.process_import_folder(
+                                    transcription_model_obj,
+                                    transcription.transcribe_audio,
+                                    notifications.send_to_discord_async
+                                )
+
+                    if not feed_has_retries:
+                        podcast_processing.mark_feed_processed(feed_url)
                 except Exception as e:
                     logger.error(f"Major error processing feed {feed_url}: {e}", exc_info=True)
             
@@ -168,8 +233,29 @@ def main_loop(transcription_model_obj, processed_episode_guids_set):
             current_sleep_interval = config.IMPORT_CHECK_INTERVAL_SECONDS
             logger.info(f"Only import directory is active. Using import check interval: {current_sleep_interval} seconds.")
         
+        if config.IDLE_UNLOAD and transcription_model_obj:
+            transcription.unload_model_weights(transcription_model_obj)
         logger.info(f"Sleeping for {current_sleep_interval} seconds...")
-        time_module.sleep(current_sleep_interval)
+        sleep_deadline = time_module.monotonic() + current_sleep_interval
+        rescan_import_folder = False
+        while True:
+            remaining_sleep = sleep_deadline - time_module.monotonic()
+            if remaining_sleep <= 0:
+                break
+            if not rescan_import_folder and not import_handler.wait_for_import_files(import_watcher, remaining_sleep):
+                break
+            if transcription_model_obj:
+                logger.info("--- Checking import folder (new file detected while sleeping) ---")
+                # The scan below picks up anything already queued; files arriving during it stay queued for the check after
+                import_handler.discard_pending_import_events(import_watcher)
+                import_handler.process_import_folder(
+                    transcription_model_obj,
+                    transcription.transcribe_audio,
+                    notifications.send_to_discord_async
+                )
+            rescan_import_folder = import_handler.discard_pending_import_events(import_watcher)
+            if config.IDLE_UNLOAD and transcription_model_obj and not rescan_import_folder:
+                transcription.unload_model_weights(transcription_model_obj)
 
 if __name__ == "__main__":
     # Basic check for critical configurations before starting
@@ -184,8 +270,15 @@ if __name__ == "__main__":
     logger.info(f"Transcription Engine: {config.TRANSCRIPTION_ENGINE}")
     logger.info(f"Whisper Model: {config.WHISPER_MODEL}, Device: {config.DEVICE}")
     if config.TRANSCRIPTION_ENGINE == "faster-whisper":
-        logger.info(f"Faster-Whisper Compute Type: {config.COMPUTE_TYPE}")
+        logger.info(f"Faster-Whisper Compute Type: {config.COMPUTE_TYPE}, CPU Threads: {config.CPU_THREADS}, Batch Size: {config.BATCH_SIZE}")
+    elif config.TRANSCRIPTION_ENGINE == "whisper.cpp":
+        logger.info(f"whisper.cpp Quantization: {config.WHISPER_CPP_QUANTIZATION or 'none'}, CPU Threads: {config.CPU_THREADS}")
+    if config.TRANSCRIPTION_ENGINE != "whisper.cpp": # whisper.cpp runs with pywhispercpp's own decoding defaults
+        logger.info(f"Beam Size: {config.BEAM_SIZE}, Condition on Previous Text: {config.CONDITION_ON_PREVIOUS_TEXT}, Temperature Fallback: {config.TEMPERATURE_FALLBACK}")
+    if config.TRANSCRIPTION_ENGINE == "faster-whisper":
+        logger.info(f"VAD Filter: {config.VAD_FILTER} (min silence {config.VAD_MIN_SILENCE_MS} ms)")
     logger.info(f"Keep MP3s from Podcasts: {config.KEEP_MP3}")
+    logger.info(f"Unload Model While Idle: {config.IDLE_UNLOAD}")
     logger.info(f"Discord Notifications: {'Enabled' if config.DISCORD_WEBHOOK_URL else 'Disabled'}")
     logger.info(f"Podcast Feeds configured: {True if config.podcast_urls else False}")
     logger.info(f"Import Directory configured: {config.IMPORT_DIR if config.IMPORT_DIR else 'Disabled'}")
@@ -200,9 +293,11 @@ if __name__ == "__main__":
         sys.exit(1)
 
     processed_episode_guids_set = podcast_processing.load_processed_episodes()
+    podcast_processing.load_feed_cache(have_processed_state=bool(processed_episode_guids_set))
+    import_watcher = import_handler.create_import_watcher()
     
     try:
-        main_loop(transcription_model_obj, processed_episode_guids_set)
+        main_loop(transcription_model_obj, processed_episode_guids_set, import_watcher)
     except KeyboardInterrupt:
         logger.info("Shutdown signal received (KeyboardInterrupt). Exiting gracefully.")
     except Exception as e:
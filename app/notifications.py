@@ -1,34 +1,80 @@
 # app/notifications.py
+import gzip
 import logging
 from pathlib import Path
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import shutil
+import tempfile
 
 logger = logging.getLogger(__name__)
 
+_MultipartEncoder = None
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder as _MultipartEncoder_imported
+    _MultipartEncoder = _MultipartEncoder_imported
+except ImportError:
+    logger.debug("requests_toolbelt not installed; Discord uploads will be buffered in memory.")
+
+# Reused across notifications so the TCP+TLS connection to Discord is kept alive
+# Only connection failures are retried: POSTs are not idempotent and a streamed upload body can't be replayed.
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=Retry(connect=3, read=0, status=0, backoff_factor=1)))
+
+# Transcripts above this size are gzip-compressed before upload
+GZIP_UPLOAD_THRESHOLD_MB = 2
+# Discord rejects webhook attachments over 8 MB; keep a margin for the multipart envelope
+DISCORD_UPLOAD_LIMIT_MB = 7.8
+
+def _post_file(webhook_url: str, payload_dict: dict, file_name: str, file_obj, content_type: str):
+    if _MultipartEncoder:
+        # Streams the file to the socket instead of building the whole multipart body in memory
+        encoder = _MultipartEncoder(fields={
+            'payload_json': json.dumps(payload_dict),
+            'file': (file_name, file_obj, content_type)
+        })
+        return session.post(webhook_url, data=encoder, headers={'Content-Type': encoder.content_type}, timeout=30)
+    files = {'file': (file_name, file_obj, content_type)}
+    data_payload = {'payload_json': json.dumps(payload_dict)}
+    return session.post(webhook_url, data=data_payload, files=files, timeout=30)
+
 def send_to_discord(webhook_url: str, file_path: Path, message_title: str):
     if not webhook_url:
         logger.debug("Discord webhook URL not set. Skipping notification.")
         return
     
-    if not file_path.exists():
+    try:
+        file_size_mb = file_path.stat().st_size / (1024 * 1024)
+    except FileNotFoundError:
         logger.error(f"Discord: Transcript file not found at {file_path}, cannot send.")
         return
+    except OSError as e:
+        logger.error(f"Discord: Could not read transcript file {file_path}, cannot send: {e}")
+        return
 
     try:
-        file_size_mb = file_path.stat().st_size / (1024 * 1024)
         discord_message_content = f"Transcription complete for: **{message_title}**"
         
-        if file_size_mb > 7.8:
-            logger.warning(f"Discord: Transcript file {file_path.name} is ~{file_size_mb:.2f}MB, sending message without file.")
-            payload = {"content": f"{discord_message_content}\n(Transcript `{file_path.name}` too large to attach: {file_size_mb:.2f}MB)"}
-            response = requests.post(webhook_url, json=payload, timeout=10)
+        if file_size_mb > GZIP_UPLOAD_THRESHOLD_MB:
+            # Natural-language text compresses several-fold, so large transcripts go out as .txt.gz
+            with open(file_path, 'rb') as src, tempfile.TemporaryFile() as gz_file:
+                with gzip.GzipFile(filename=file_path.name, mode='wb', fileobj=gz_file, compresslevel=6) as gz:
+                    shutil.copyfileobj(src, gz, length=1024 * 1024)
+                gz_size_mb = gz_file.tell() / (1024 * 1024)
+                if gz_size_mb > DISCORD_UPLOAD_LIMIT_MB:
+                    logger.warning(f"Discord: Transcript file {file_path.name} is ~{gz_size_mb:.2f}MB even gzip-compressed, sending message without file.")
+                    payload = {"content": f"{discord_message_content}\n(Transcript `{file_path.name}` too large to attach: {file_size_mb:.2f}MB)"}
+                    response = session.post(webhook_url, json=payload, timeout=10)
+                else:
+                    gz_file.seek(0)
+                    logger.info(f"Discord: Transcript file {file_path.name} is ~{file_size_mb:.2f}MB, uploading gzip-compressed ({gz_size_mb:.2f}MB).")
+                    response = _post_file(webhook_url, {"content": discord_message_content}, f"{file_path.name}.gz", gz_file, 'application/gzip')
         else:
             with open(file_path, 'rb') as f:
-                payload_dict = {"content": discord_message_content}
-                files = {'file': (file_path.name, f, 'text/plain')}
-                data_payload = {'payload_json': json.dumps(payload_dict)}
-                response = requests.post(webhook_url, data=data_payload, files=files, timeout=30)
+                response = _post_file(webhook_url, {"content": discord_message_content}, file_path.name, f, 'text/plain')
         
         response.raise_for_status()
         logger.info(f"Successfully sent notification for {file_path.name} to Discord.")
@@ -44,4 +90,22 @@ def send_to_discord(webhook_url: str, file_path: Path, message_title: str):
     except requests.exceptions.RequestException as e:
         logger.error(f"Network error sending notification for {file_path.name} to Discord: {e}")
     except Exception as e: 
-        logger.error(f"An unexpected error sending to Discord for {file_path.name}: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"An unexpected error sending to Discord for {file_path.name}: {e}", exc_info=True)
+
+# A single worker keeps notifications in the order episodes finished while taking uploads off the transcription path
+_discord_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="discord")
+
+def send_to_discord_async(webhook_url: str, file_path: Path, message_title: str):
+    """Queues send_to_discord on the background worker; returns immediately. Pending uploads finish before exit."""
+    if not webhook_url:
+        logger.debug("Discord webhook URL not set. Skipping notification.")
+        return None
+    future = _discord_pool.submit(send_to_discord, webhook_url, file_path, message_title)
+    future.add_done_callback(_log_discord_failure)
+    return future
+
+def _log_discord_failure(future):
+    # send_to_discord logs its own errors; this only catches anything that escapes it
+    exc = future.exception()
+    if exc:
+        logger.error(f"Discord notification task failed: {exc}")
@@ -1,41 +1,146 @@
 # app/podcast_processing.py
+import atexit
+import functools
+import hashlib
+import json
 import logging
+import os
+import struct
+import sys
+from array import array
 import feedparser
 import requests
-import time as time_module # Use alias
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import shutil
 from datetime import datetime, timezone
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import config # Import from our config module
 import utils # Import from our utils module
 
 logger = logging.getLogger(__name__)
 
+FEED_FETCH_WORKERS = 8
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RESUME_ATTEMPTS = 3 # Mid-stream disconnects resume with an HTTP Range request instead of restarting
+STATE_RECORD = struct.Struct('<Q') # One little-endian uint64 GUID hash per processed episode
+
+# Shared across feed fetch threads so connections to feed hosts are pooled and reused
+# Transient feed host errors (rate limiting, 5xx) are retried with backoff instead of skipping the feed for a cycle.
+# Retry-After is ignored: urllib3 would sleep for whatever the server asks, and one feed would stall the whole cycle.
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+session = requests.Session()
+_feed_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16,
+                            max_retries=Retry(total=3, backoff_factor=1, status_forcelist=HTTP_RETRY_STATUSES,
+                                              respect_retry_after_header=False))
+session.mount('http://', _feed_adapter)
+session.mount('https://', _feed_adapter)
+session.headers['User-Agent'] = feedparser.USER_AGENT
+# Feed XML compresses to a fraction of its size; requests decodes it before feedparser sees response.content
+session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+# Episode downloads get their own session so proxies (HTTP(S)_PROXY, NO_PROXY) and REQUESTS_CA_BUNDLE are honoured
+# per redirect hop, while the body is copied straight from the urllib3 response in large chunks.
+# Enclosure URLs often pass through several tracking redirects, hence the separate redirect budget.
+DOWNLOAD_TIMEOUT = (10, 300) # (connect, read) seconds
+_download_session = requests.Session()
+_download_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                max_retries=Retry(connect=3, read=3, status=3, backoff_factor=0.5,
+                                                  status_forcelist=HTTP_RETRY_STATUSES, raise_on_status=False,
+                                                  respect_retry_after_header=False))
+_download_session.mount('http://', _download_adapter)
+_download_session.mount('https://', _download_adapter)
+_download_session.max_redirects = 10
+
+# Per-feed ETag/Last-Modified/body digest from the last fully processed fetch, used for conditional GETs
+_feed_validators = {}
+# Validators from the latest fetch, promoted by mark_feed_processed once every entry was handled
+_pending_feed_validators = {}
+
+def episode_key(episode_id):
+    """Returns the 64-bit hash of an episode GUID that is held in the processed set and state file."""
+    return int.from_bytes(hashlib.blake2b(episode_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _read_packed_keys(data):
+    keys = array('Q')
+    keys.frombytes(data[:len(data) - len(data) % keys.itemsize]) # Ignore a torn trailing record
+    if sys.byteorder != 'little':
+        keys.byteswap()
+    return keys
+
+def _migrate_legacy_state_file():
+    """Converts the old newline-separated GUID log into the packed state file. Returns the migrated keys."""
+    keys = {episode_key(line) for line in config.LEGACY_STATE_FILE.read_text(encoding='utf-8').splitlines() if line.strip()}
+    with open(config.STATE_FILE, 'wb') as f:
+        f.write(b''.join(STATE_RECORD.pack(key) for key in keys))
+    logger.info(f"Migrated {len(keys)} processed episode GUIDs from {config.LEGACY_STATE_FILE} to {config.STATE_FILE}")
+    return keys
+
 def load_processed_episodes():
     processed = set()
-    if config.STATE_FILE.exists():
-        try:
-            with open(config.STATE_FILE, 'r') as f:
-                for line in f:
-                    processed.add(line.strip())
-            logger.info(f"Loaded {len(processed)} processed episode GUIDs from {config.STATE_FILE}")
-        except Exception as e:
-            logger.error(f"Error loading state file {config.STATE_FILE}: {e}")
-    else:
-        logger.info(f"State file {config.STATE_FILE} not found for podcast episodes. Starting fresh.")
+    try:
+        if config.STATE_FILE.exists():
+            data = config.STATE_FILE.read_bytes()
+            processed = set(_read_packed_keys(data))
+            torn_bytes = len(data) % STATE_RECORD.size
+            if torn_bytes:
+                # A crash mid-append left a partial record; later appends would be misaligned behind it
+                logger.warning(f"Discarding {torn_bytes}-byte partial record at the end of {config.STATE_FILE}.")
+                os.truncate(config.STATE_FILE, len(data) - torn_bytes)
+            logger.info(f"Loaded {len(processed)} processed episode hashes from {config.STATE_FILE}")
+        elif config.LEGACY_STATE_FILE.exists():
+            processed = _migrate_legacy_state_file()
+        else:
+            logger.info(f"State file {config.STATE_FILE} not found for podcast episodes. Starting fresh.")
+    except Exception as e:
+        logger.error(f"Error loading state file {config.STATE_FILE}: {e}")
     return processed
 
+# Kept open for the lifetime of the process instead of reopening the state file per episode
+_state_fh = None
+
+def _close_state_file():
+    global _state_fh
+    if _state_fh:
+        try:
+            _state_fh.close()
+        except OSError as e:
+            logger.error(f"Error closing state file {config.STATE_FILE}: {e}")
+        _state_fh = None
+
 def save_processed_episode(episode_id):
+    global _state_fh
     try:
-        config.STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(config.STATE_FILE, 'a') as f:
-            f.write(f"{episode_id}\n")
+        if _state_fh is None:
+            config.STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            _state_fh = open(config.STATE_FILE, 'ab', buffering=0) # Unbuffered: each record hits disk on write
+            atexit.register(_close_state_file)
+        _state_fh.write(STATE_RECORD.pack(episode_key(episode_id)))
     except Exception as e:
         logger.error(f"Error saving state for episode {episode_id} to {config.STATE_FILE}: {e}")
 
+@functools.lru_cache(maxsize=1024)
+def _parse_published_string(published):
+    """Parses an RFC 822 style 'published' string to an aware UTC datetime, or None. Cached across feed scans."""
+    try:
+        return datetime.strptime(published, "%a, %d %b %Y %H:%M:%S %z").astimezone(timezone.utc)
+    except ValueError:
+        try:
+            return datetime.strptime(published, "%a, %d %b %Y %H:%M:%S %Z").replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
+
+def get_episode_guid(entry):
+    """Cheap lookup of the entry's unique ID, so processed episodes can be skipped before full parsing."""
+    return entry.get('id') or entry.get('guid') or entry.get('link')
+
 def get_episode_data(entry):
     # Using GUID as primary identifier
-    episode_id = entry.get('id') or entry.get('guid') or entry.get('link')
+    episode_id = get_episode_guid(entry)
     mp3_url = None
     published_date = None
     
@@ -48,17 +153,14 @@ def get_episode_data(entry):
 
     try:
         if 'published_parsed' in entry and entry.published_parsed:
-            utc_timestamp = time_module.mktime(entry.published_parsed)
-            published_date = datetime.fromtimestamp(utc_timestamp, timezone.utc)
+            # published_parsed is a UTC struct_time, so its fields map straight onto an aware datetime (leap second clamped)
+            parsed = entry.published_parsed
+            published_date = datetime(*parsed[:5], min(parsed[5], 59), tzinfo=timezone.utc)
         elif 'published' in entry:
             # Attempt to parse 'published' string
-            try:
-                published_date = datetime.strptime(entry.published, "%a, %d %b %Y %H:%M:%S %z").astimezone(timezone.utc)
-            except ValueError:
-                try:
-                    published_date = datetime.strptime(entry.published, "%a, %d %b %Y %H:%M:%S %Z").replace(tzinfo=timezone.utc)
-                except ValueError:
-                    logger.debug(f"Could not parse 'published' string: {entry.published} for episode {filename_base} (ID: {episode_id})")
+            published_date = _parse_published_string(entry.published)
+            if not published_date and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Could not parse 'published' string: {entry.published} for episode {filename_base} (ID: {episode_id})")
     except Exception as e:
         logger.warning(f"Error parsing publication date for episode {filename_base} (ID: {episode_id}): {e}")
 
@@ -69,33 +171,142 @@ def get_episode_data(entry):
                 break
     if not mp3_url:
         link = entry.get('link')
-        if link and any(link.lower().endswith(ext) for ext in config.SUPPORTED_IMPORT_EXTENSIONS):
+        # One set lookup on the path's suffix; also accepts links carrying a query string (e.g. ?source=rss)
+        if link and Path(urlsplit(link).path).suffix.lower() in config.SUPPORTED_IMPORT_EXTENSIONS:
             mp3_url = link
         else:
-            logger.debug(f"No audio enclosure or suitable link for episode {filename_base} (ID: {episode_id}). Skipping.")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"No audio enclosure or suitable link for episode {filename_base} (ID: {episode_id}). Skipping.")
             return episode_id, title, None, None, published_date
             
     return episode_id, title, mp3_url, filename_base, published_date
 
 def download_episode(url, target_path: Path):
+    # Written beside the target and renamed on completion, so target_path only ever holds a complete file
+    part_path = target_path.parent / (target_path.name + '.part')
     try:
-        target_path.parent.mkdir(parents=True, exist_ok=True)
         logger.info(f"Downloading: {url} to {target_path}")
-        response = requests.get(url, stream=True, timeout=300)
-        response.raise_for_status()
-        with open(target_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        with open(part_path, 'wb') as f:
+            for attempt in range(DOWNLOAD_RESUME_ATTEMPTS + 1):
+                offset = f.tell()
+                # identity: MP3s don't compress, and Range offsets must count bytes as written to disk
+                headers = {'User-Agent': session.headers['User-Agent'], 'Accept-Encoding': 'identity'}
+                if offset:
+                    headers['Range'] = f'bytes={offset}-'
+                response = _download_session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT)
+                try:
+                    if offset and response.status_code == 200: # Server ignored the Range header; start over
+                        f.seek(0)
+                        f.truncate()
+                    elif response.status_code >= 400:
+                        raise urllib3.exceptions.HTTPError(f"HTTP {response.status_code} {response.reason}")
+                    try:
+                        shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+                        break
+                    except (urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError) as e:
+                        if attempt == DOWNLOAD_RESUME_ATTEMPTS:
+                            raise
+                        logger.warning(f"Download of {url} interrupted after {f.tell()} bytes ({e}). Resuming.")
+                finally:
+                    response.close()
+        part_path.replace(target_path) # Atomic rename within the same directory
         logger.info(f"Download complete: {target_path}")
         return True
-    except requests.exceptions.RequestException as e:
+    except (urllib3.exceptions.HTTPError, requests.exceptions.RequestException) as e:
         logger.error(f"Failed to download {url}: {e}")
     except Exception as e:
         logger.error(f"An unexpected error occurred during download of {url}: {e}")
     
-    if target_path.exists(): # Cleanup incomplete download
-        try:
-            target_path.unlink()
-        except OSError as oe:
-            logger.error(f"Error removing incomplete file {target_path}: {oe}")
-    return False
\ No newline at end of file
+    try: # Cleanup incomplete download
+        part_path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as oe:
+        logger.error(f"Error removing incomplete file {part_path}: {oe}")
+    return False
+
+def load_feed_cache(have_processed_state=True):
+    """Loads per-feed validators persisted by a previous run.
+    A skipped feed is never re-evaluated, so the cache is ignored when the processed-episode state was missing or empty
+    (state reset) and per feed when the record was written under a different LOOKBACK_DAYS."""
+    global _feed_validators
+    if not have_processed_state:
+        logger.info(f"No processed-episode state found; ignoring feed cache {config.FEED_CACHE_FILE} so every feed is re-evaluated.")
+        _feed_validators = {}
+        return
+    try:
+        with open(config.FEED_CACHE_FILE, 'r') as f:
+            cached = json.load(f)
+        _feed_validators = {url: record for url, record in cached.items()
+                            if record.get('lookback_days') == config.LOOKBACK_DAYS}
+        if len(_feed_validators) != len(cached):
+            logger.info(f"Dropped {len(cached) - len(_feed_validators)} cached feed records written with a different LOOKBACK_DAYS.")
+        logger.info(f"Loaded cached validators for {len(_feed_validators)} feeds from {config.FEED_CACHE_FILE}")
+    except FileNotFoundError:
+        logger.info(f"Feed cache {config.FEED_CACHE_FILE} not found. All feeds will be fetched in full.")
+    except Exception as e:
+        logger.error(f"Error loading feed cache {config.FEED_CACHE_FILE}: {e}")
+        _feed_validators = {}
+
+def _save_feed_cache():
+    temp_path = config.FEED_CACHE_FILE.with_suffix('.tmp')
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(_feed_validators, f)
+        temp_path.replace(config.FEED_CACHE_FILE)
+    except Exception as e:
+        logger.error(f"Error saving feed cache {config.FEED_CACHE_FILE}: {e}")
+
+def fetch_feed(feed_url):
+    """Fetches and parses a feed. Returns None if it is unchanged since the last processed fetch or could not be fetched."""
+    logger.info(f"Checking feed: {feed_url}")
+    headers = {}
+    validators = _feed_validators.get(feed_url, {})
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('modified'):
+        headers['If-Modified-Since'] = validators['modified']
+
+    try:
+        response = session.get(feed_url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            logger.info(f"Feed {feed_url} not modified since last check. Skipping.")
+            return None
+        response.raise_for_status()
+    except requests.exceptions.ConnectionError as rce:
+        logger.error(f"Connection error for feed {feed_url}: {rce}. Will retry next cycle.")
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Feed {feed_url} could not be fetched: {e}. Skipping for this cycle.")
+        return None
+
+    # Some hosts never answer 304; an identical body since the last processed fetch is just as unchanged
+    digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+    if validators.get('digest') == digest:
+        logger.info(f"Feed {feed_url} content unchanged since last check. Skipping.")
+        return None
+
+    _pending_feed_validators[feed_url] = {
+        'etag': response.headers.get('ETag'),
+        'modified': response.headers.get('Last-Modified'),
+        'digest': digest,
+        'lookback_days': config.LOOKBACK_DAYS # Records are only trusted under the lookback window they were processed with
+    }
+    # feedparser expects lower-case header names; content-location lets it resolve relative links
+    response_headers = {k.lower(): v for k, v in response.headers.items()}
+    response_headers.setdefault('content-location', response.url)
+    return feedparser.parse(response.content, response_headers=response_headers)
+
+def fetch_feeds(feed_urls):
+    """Fetches all feeds concurrently. Returns (feed_url, feed) pairs in the original order; feed may be None."""
+    if not feed_urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(FEED_FETCH_WORKERS, len(feed_urls))) as executor:
+        return list(zip(feed_urls, executor.map(fetch_feed, feed_urls)))
+
+def mark_feed_processed(feed_url):
+    """Remembers the feed's validators so the next fetch can be conditional. Call only when no episode needs a retry."""
+    validators = _pending_feed_validators.pop(feed_url, None)
+    if validators and validators != _feed_validators.get(feed_url):
+        _feed_validators[feed_url] = validators
+        _save_feed_cache()
\ No newline at end of file
@@ -1,8 +1,8 @@
 # app/transcription.py
 import logging
 from pathlib import Path
-import shutil
 import os # Added for os.getenv
+import threading
 
 import config
 import utils
@@ -10,25 +10,97 @@ import utils
 logger = logging.getLogger(__name__)
 
 _WhisperModel = None
+_BatchedInferencePipeline = None
 _openai_whisper = None
+_WhisperCppModel = None
+_whisper_cpp_available_models = None
+_decode_audio = None
+_LocalEntryNotFoundError = FileNotFoundError # huggingface_hub's cache-miss error subclasses it
 
-# Conditional imports for engine libraries (done at module level based on config for simplicity here)
-# Entrypoint will ensure these are installed before Python script runs.
-if config.TRANSCRIPTION_ENGINE == "faster-whisper":
-    try:
-        from faster_whisper import WhisperModel as _WhisperModel_imported
-        _WhisperModel = _WhisperModel_imported
-    except ImportError:
-        # This error should ideally be caught by entrypoint pre-flight check
-        logger.error("faster-whisper library not found by Python script. Entrypoint should have installed it.")
-elif config.TRANSCRIPTION_ENGINE == "openai-whisper":
-    try:
-        import whisper as _openai_whisper_imported
-        _openai_whisper = _openai_whisper_imported
-    except ImportError:
-        logger.error("openai-whisper library not found by Python script. Entrypoint should have installed it.")
+SAMPLE_RATE = 16000 # All Whisper variants consume 16 kHz mono float32
+
+_engine_imported = set()
+
+def _import_engine(engine_name: str):
+    """Imports the selected engine's library on first use, so importing this module stays cheap.
+    Entrypoint will ensure these are installed before Python script runs."""
+    global _WhisperModel, _BatchedInferencePipeline, _openai_whisper, _WhisperCppModel, _whisper_cpp_available_models, _decode_audio
+    global _LocalEntryNotFoundError
+    if engine_name in _engine_imported:
+        return
+    _engine_imported.add(engine_name)
+    if engine_name == "faster-whisper":
+        try:
+            from faster_whisper import WhisperModel as _WhisperModel_imported
+            _WhisperModel = _WhisperModel_imported
+        except ImportError:
+            # This error should ideally be caught by entrypoint pre-flight check
+            logger.error("faster-whisper library not found by Python script. Entrypoint should have installed it.")
+        try:
+            from faster_whisper import BatchedInferencePipeline as _BatchedInferencePipeline_imported
+            _BatchedInferencePipeline = _BatchedInferencePipeline_imported
+        except ImportError:
+            logger.debug("faster-whisper BatchedInferencePipeline not available (requires faster-whisper >= 1.1).")
+        try:
+            from faster_whisper.audio import decode_audio as _decode_audio_imported
+            _decode_audio = _decode_audio_imported
+        except ImportError:
+            logger.debug("faster-whisper decode_audio not available; engine will decode from the file path.")
+        try:
+            from huggingface_hub.utils import LocalEntryNotFoundError as _LocalEntryNotFoundError_imported
+            _LocalEntryNotFoundError = _LocalEntryNotFoundError_imported
+        except ImportError:
+            logger.debug("huggingface_hub LocalEntryNotFoundError not available; treating FileNotFoundError as a cache miss.")
+    elif engine_name == "openai-whisper":
+        try:
+            import whisper as _openai_whisper_imported
+            _openai_whisper = _openai_whisper_imported
+        except ImportError:
+            logger.error("openai-whisper library not found by Python script. Entrypoint should have installed it.")
+    elif engine_name == "whisper.cpp":
+        try:
+            from pywhispercpp.model import Model as _WhisperCppModel_imported
+            _WhisperCppModel = _WhisperCppModel_imported
+        except ImportError:
+            logger.error("pywhispercpp library not found by Python script. Entrypoint should have installed it.")
+        try:
+            from pywhispercpp.constants import AVAILABLE_MODELS as _available_models_imported
+            _whisper_cpp_available_models = frozenset(_available_models_imported)
+        except ImportError:
+            logger.debug("pywhispercpp AVAILABLE_MODELS not available; quantized model names will not be validated.")
+
+# The loaded model is kept for the life of the process; reloading re-reads hundreds of MB of weights
+_model_lock = threading.Lock()
+_cached_model = None
+_cached_model_key = None
 
 def load_transcription_model():
+    """Returns the transcription model for the current config, loading it only on first use."""
+    global _cached_model, _cached_model_key
+    model_key = (config.TRANSCRIPTION_ENGINE, config.WHISPER_MODEL, config.DEVICE, config.COMPUTE_TYPE)
+    with _model_lock:
+        if _cached_model is not None and _cached_model_key == model_key:
+            return _cached_model
+        model = _load_transcription_model_uncached()
+        if model is not None:
+            _cached_model, _cached_model_key = model, model_key
+        return model
+
+def _warm_up_faster_whisper(model) -> bool:
+    """Decodes one second of silence so CTranslate2 workspace allocation and kernel/JIT setup happen at startup.
+    Returns False if decoding failed."""
+    try:
+        import numpy as np # Always present alongside faster-whisper
+        segments, _ = model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), beam_size=1, without_timestamps=True)
+        for _ in segments:
+            pass
+        logger.debug("faster-whisper warmup complete.")
+        return True
+    except Exception as e:
+        logger.warning(f"faster-whisper warmup failed: {e}")
+        return False
+
+def _load_transcription_model_uncached():
     model = None
     engine_name = config.TRANSCRIPTION_ENGINE
     model_name = config.WHISPER_MODEL
@@ -38,7 +110,13 @@ def load_transcription_model():
     # Get model cache paths from environment variables (set by entrypoint.sh)
     openai_cache_dir = os.getenv("WHISPER_OPENAI_CACHE_DIR")
     faster_cache_dir = os.getenv("WHISPER_FASTER_CACHE_DIR")
+    whisper_cpp_cache_dir = os.getenv("WHISPER_CPP_CACHE_DIR")
 
+    if device == "cpu":
+        # OpenMP reads this when the engine library loads; an explicit user setting wins.
+        # No OMP_PROC_BIND/OMP_PLACES: binding pins the main thread, and the download/decode/Discord threads inherit it.
+        os.environ.setdefault("OMP_NUM_THREADS", str(config.CPU_THREADS))
+    _import_engine(engine_name)
     try:
         logger.info(f"Attempting to load model '{model_name}' for engine '{engine_name}' on device '{device}'.")
         if engine_name == "faster-whisper":
@@ -46,25 +124,68 @@ def load_transcription_model():
                 logger.error("Faster-whisper engine selected, but model class not available (import failed).")
                 return None
             logger.info(f"Using faster-whisper cache path: {faster_cache_dir or 'default'}")
-            model = _WhisperModel(
-                model_name,
-                device=device,
-                compute_type=compute_type,
-                download_root=faster_cache_dir # Use this to specify cache/download directory
-            )
+            model_options = {
+                "device": device,
+                "compute_type": compute_type,
+                "cpu_threads": config.CPU_THREADS,
+                "download_root": faster_cache_dir # Use this to specify cache/download directory
+            }
+            def load_faster_whisper(options):
+                try:
+                    # A cached model loads without a Hugging Face Hub round trip (and works offline)
+                    return _WhisperModel(model_name, local_files_only=True, **options)
+                except _LocalEntryNotFoundError as e: # Anything else (CUDA init, corrupt files) would fail the same way after a download
+                    logger.info(f"Model '{model_name}' not available from local cache ({e}). Downloading.")
+                    return _WhisperModel(model_name, **options)
+            try:
+                model = load_faster_whisper(model_options)
+            except ValueError as e:
+                # CTranslate2 rejects a compute type the device cannot run (e.g. int8_float16 on pre-Turing GPUs)
+                if compute_type == "auto":
+                    raise
+                logger.warning(f"Compute type '{compute_type}' is not supported on '{device}' ({e}). Retrying with 'auto'.")
+                model = load_faster_whisper({**model_options, "compute_type": "auto"})
+            if not _warm_up_faster_whisper(model) and device == "cuda":
+                # On CUDA this is almost always missing cuBLAS 12 / cuDNN 9 libraries; every transcription would fail the same way
+                logger.error("faster-whisper cannot run on CUDA (are cuBLAS 12 and cuDNN 9 available?). Set DEVICE=cpu to transcribe on the CPU.")
+                return None
         elif engine_name == "openai-whisper":
             if not _openai_whisper:
                 logger.error("OpenAI-Whisper engine selected, but library not available (import failed).")
                 return None
             logger.info(f"Using openai-whisper cache path: {openai_cache_dir or 'default (~/.cache/whisper)'}")
+            # openai-whisper has no int8 backend (COMPUTE_TYPE is ignored); use faster-whisper for quantized inference
             # openai-whisper uses XDG_CACHE_HOME or specific download_root in load_model
             # Setting XDG_CACHE_HOME in entrypoint is one way. Or pass download_root if supported.
             # For openai-whisper, load_model has a 'download_root' parameter.
+            if device == "cuda":
+                import torch # Present whenever openai-whisper is
+                if not torch.cuda.is_available():
+                    logger.warning("DEVICE=cuda requested, but this PyTorch build sees no CUDA device. Loading openai-whisper on CPU (fp32).")
+                    device = "cpu"
             model = _openai_whisper.load_model(
                 model_name,
                 device=device,
                 download_root=openai_cache_dir # Specify download/cache directory
             )
+        elif engine_name == "whisper.cpp":
+            if not _WhisperCppModel:
+                logger.error("whisper.cpp engine selected, but pywhispercpp not available (import failed).")
+                return None
+            # GGML quantized variants are separate model files, e.g. 'small-q8_0'
+            ggml_model_name = f"{model_name}-{config.WHISPER_CPP_QUANTIZATION}" if config.WHISPER_CPP_QUANTIZATION else model_name
+            if _whisper_cpp_available_models is not None and ggml_model_name not in _whisper_cpp_available_models:
+                # Not every size ships every quantization (e.g. no 'large-v3-q8_0' or 'tiny-q5_0')
+                logger.warning(f"whisper.cpp model '{ggml_model_name}' is not published by pywhispercpp. Falling back to unquantized '{model_name}'.")
+                ggml_model_name = model_name
+            logger.info(f"Using whisper.cpp model '{ggml_model_name}', cache path: {whisper_cpp_cache_dir or 'default'}")
+            model = _WhisperCppModel(
+                ggml_model_name,
+                models_dir=whisper_cpp_cache_dir,
+                n_threads=config.CPU_THREADS,
+                print_progress=False,
+                print_realtime=False
+            )
         else:
             logger.error(f"Cannot load model: Unsupported TRANSCRIPTION_ENGINE: {engine_name}")
             return None
@@ -78,70 +199,227 @@ def load_transcription_model():
 # remains the same as the version with direct imports ('import config', 'import utils')
 # and using utils.format_timestamp, config.DEBUG_LOGGING.
 
-def transcribe_audio_faster_whisper(model: '_WhisperModel', audio_path: Path, final_output_txt_path: Path):
-    temp_output_txt_path = final_output_txt_path.with_suffix(final_output_txt_path.suffix + '.processing')
+SEGMENT_WRITE_CHUNK_CHARS = 4096
+TRANSCRIPT_BUFFER_SIZE = 1024 * 1024 # Most transcripts reach disk in a single write() at close
+
+def _write_segments(f, segments, debug_label: str) -> int:
+    """Writes '[start --> end] text' lines for (start, end, text) tuples to f. Returns the segment count."""
+    # Hoisted out of the per-segment loop: attribute lookups and the debug flag don't change mid-file
+    format_timestamp = utils.format_timestamp
+    debug_logging = config.DEBUG_LOGGING and logger.isEnabledFor(logging.DEBUG)
+    segment_count = 0
+    # Lines are joined and written in ~SEGMENT_WRITE_CHUNK_CHARS blocks rather than one write per segment
+    pending_lines = []
+    append = pending_lines.append
+    pending_chars = 0
+    # Consecutive segments usually share a boundary, so the previous end string is reused for the next start
+    previous_end, previous_end_str = None, None
+    for start, end, text in segments:
+        start_str = previous_end_str if start == previous_end else format_timestamp(start)
+        previous_end, previous_end_str = end, format_timestamp(end)
+        line = f"[{start_str} --> {previous_end_str}] {text.strip()}\n"
+        append(line)
+        pending_chars += len(line)
+        if pending_chars >= SEGMENT_WRITE_CHUNK_CHARS:
+            f.write("".join(pending_lines))
+            pending_lines.clear()
+            pending_chars = 0
+        segment_count += 1
+        if debug_logging:
+            logger.debug("%s %d: %s", debug_label, segment_count, line.rstrip())
+    if pending_lines:
+        f.write("".join(pending_lines))
+    return segment_count
+
+def load_audio(audio_path: Path):
+    """Decodes audio_path once to a 16 kHz mono float32 array, or returns the path if no in-process decoder is loaded.
+    Safe to call from a worker thread once the model is loaded, so decoding can overlap another transcription."""
+    if _decode_audio:
+        return _decode_audio(str(audio_path), sampling_rate=SAMPLE_RATE) # PyAV, no ffmpeg subprocess
+    if _openai_whisper:
+        return _openai_whisper.load_audio(str(audio_path), sr=SAMPLE_RATE)
+    return str(audio_path)
+
+_batched_pipeline = None
+_batching_unavailable_logged = False
+
+def _get_batched_pipeline(model):
+    """Returns a BatchedInferencePipeline wrapping model, or None if batching is disabled or unavailable."""
+    global _batched_pipeline, _batching_unavailable_logged
+    if config.BATCH_SIZE <= 1:
+        return None
+    if not config.VAD_FILTER:
+        # The batched pipeline builds its 30s windows from VAD speech chunks; without VAD it rejects audio over 30s
+        if not _batching_unavailable_logged:
+            logger.warning(f"BATCH_SIZE={config.BATCH_SIZE} requested, but batching requires VAD_FILTER=true. Transcribing unbatched.")
+            _batching_unavailable_logged = True
+        return None
+    if not _BatchedInferencePipeline:
+        if not _batching_unavailable_logged:
+            logger.warning(f"BATCH_SIZE={config.BATCH_SIZE} requested, but this faster-whisper version has no BatchedInferencePipeline. Transcribing unbatched.")
+            _batching_unavailable_logged = True
+        return None
+    if _batched_pipeline is None or _batched_pipeline.model is not model:
+        _batched_pipeline = _BatchedInferencePipeline(model=model)
+    return _batched_pipeline
+
+def transcribe_audio_faster_whisper(model: '_WhisperModel', audio_path: Path, final_output_txt_path: Path, audio=None):
+    temp_output_txt_path = final_output_txt_path.parent / (final_output_txt_path.name + '.processing')
     try:
-        final_output_txt_path.parent.mkdir(parents=True, exist_ok=True)
         logger.info(f"[faster-whisper] Starting transcription for: {audio_path} -> {temp_output_txt_path}")
-        segments_generator, info = model.transcribe(str(audio_path), beam_size=5)
+        transcribe_options = {
+            "beam_size": config.BEAM_SIZE,
+            "condition_on_previous_text": config.CONDITION_ON_PREVIOUS_TEXT,
+            "vad_filter": config.VAD_FILTER,
+        }
+        if not config.TEMPERATURE_FALLBACK:
+            transcribe_options["temperature"] = 0.0
+        if config.VAD_FILTER:
+            # Speech blips under 250 ms (clicks, breaths, music stings) are dropped instead of costing a decoder window
+            transcribe_options["vad_parameters"] = {
+                "threshold": 0.5,
+                "min_speech_duration_ms": 250,
+                "min_silence_duration_ms": config.VAD_MIN_SILENCE_MS,
+            }
+        if audio is None:
+            audio = load_audio(audio_path)
+        batched_pipeline = _get_batched_pipeline(model)
+        if batched_pipeline:
+            # Splits the audio into 30s windows and decodes BATCH_SIZE of them per model call
+            segments_generator, info = batched_pipeline.transcribe(audio, batch_size=config.BATCH_SIZE, **transcribe_options)
+        else:
+            segments_generator, info = model.transcribe(audio, **transcribe_options)
         
         logger.info(f"[faster-whisper] Detected language '{info.language}' with probability {info.language_probability:.2f}")
         logger.info(f"[faster-whisper] Audio duration processed: {utils.format_timestamp(info.duration)}")
         
-        segment_count = 0
-        with open(temp_output_txt_path, 'w', encoding='utf-8') as f:
-            for segment in segments_generator:
-                start_str = utils.format_timestamp(segment.start)
-                end_str = utils.format_timestamp(segment.end)
-                segment_text = segment.text.strip()
-                f.write(f"[{start_str} --> {end_str}] {segment_text}\n")
-                segment_count += 1
-                if config.DEBUG_LOGGING:
-                    logger.debug(f"[faster-whisper] Segment {segment_count}: [{start_str} --> {end_str}] {segment_text}")
+        with open(temp_output_txt_path, 'w', encoding='utf-8', buffering=TRANSCRIPT_BUFFER_SIZE, newline='\n') as f:
+            segment_count = _write_segments(
+                f,
+                ((segment.start, segment.end, segment.text) for segment in segments_generator),
+                "[faster-whisper] Segment"
+            )
+            f.flush()
+            os.fsync(f.fileno()) # Make the rename below publish a complete file even after a crash
         
-        shutil.move(str(temp_output_txt_path), str(final_output_txt_path))
+        os.replace(temp_output_txt_path, final_output_txt_path) # Same directory, so a single atomic rename
         logger.info(f"[faster-whisper] Transcription with {segment_count} segments saved to {final_output_txt_path}")
         return True
     except Exception as e:
         logger.error(f"[faster-whisper] Failed to transcribe {audio_path}: {e}", exc_info=True)
-        if temp_output_txt_path.exists():
-            try: temp_output_txt_path.unlink()
-            except OSError as oe: logger.error(f"Error deleting temp transcript file {temp_output_txt_path} on error: {oe}")
+        try: temp_output_txt_path.unlink()
+        except FileNotFoundError: pass
+        except OSError as oe: logger.error(f"Error deleting temp transcript file {temp_output_txt_path} on error: {oe}")
         return False
 
-def transcribe_audio_openai_whisper(model, audio_path: Path, final_output_txt_path: Path):
-    temp_output_txt_path = final_output_txt_path.with_suffix(final_output_txt_path.suffix + '.processing')
+def transcribe_audio_openai_whisper(model, audio_path: Path, final_output_txt_path: Path, audio=None):
+    temp_output_txt_path = final_output_txt_path.parent / (final_output_txt_path.name + '.processing')
     try:
-        final_output_txt_path.parent.mkdir(parents=True, exist_ok=True)
         logger.info(f"[openai-whisper] Starting transcription for: {audio_path} -> {temp_output_txt_path}")
-        result = model.transcribe(str(audio_path), verbose=config.DEBUG_LOGGING) 
+        # openai-whisper decodes greedily unless beam_size is given, so only pass it when beam search is wanted
+        decode_options = {"beam_size": config.BEAM_SIZE} if config.BEAM_SIZE > 1 else {}
+        decode_options["condition_on_previous_text"] = config.CONDITION_ON_PREVIOUS_TEXT
+        if not config.TEMPERATURE_FALLBACK:
+            decode_options["temperature"] = 0.0
+        # fp16 halves activation bandwidth on CUDA; on CPU openai-whisper only supports fp32, so ask for it explicitly
+        # verbose=None: no per-segment print() or progress bar in the decode loop; _write_segments logs segments under DEBUG
+        if audio is None:
+            audio = load_audio(audio_path)
+        result = model.transcribe(audio, verbose=None, fp16=(model.device.type == "cuda"), **decode_options) 
         logger.info(f"[openai-whisper] Detected language '{result['language']}'")
         
-        segment_count = 0
-        with open(temp_output_txt_path, 'w', encoding='utf-8') as f:
-            for segment in result["segments"]:
-                start_str = utils.format_timestamp(segment.start)
-                end_str = utils.format_timestamp(segment.end)
-                segment_text = segment['text'].strip()
-                f.write(f"[{start_str} --> {end_str}] {segment_text}\n")
-                segment_count += 1
-                if config.DEBUG_LOGGING: 
-                    logger.debug(f"[openai-whisper] Script logged Segment {segment_count}: [{start_str} --> {end_str}] {segment_text}")
-        shutil.move(str(temp_output_txt_path), str(final_output_txt_path))
+        with open(temp_output_txt_path, 'w', encoding='utf-8', buffering=TRANSCRIPT_BUFFER_SIZE, newline='\n') as f:
+            segment_count = _write_segments(
+                f,
+                ((segment['start'], segment['end'], segment['text']) for segment in result["segments"]),
+                "[openai-whisper] Script logged Segment"
+            )
+            f.flush()
+            os.fsync(f.fileno()) # Make the rename below publish a complete file even after a crash
+        os.replace(temp_output_txt_path, final_output_txt_path) # Same directory, so a single atomic rename
         logger.info(f"[openai-whisper] Transcription with {segment_count} segments saved to {final_output_txt_path}")
         return True
     except Exception as e:
         logger.error(f"[openai-whisper] Failed to transcribe {audio_path}: {e}", exc_info=True)
-        if temp_output_txt_path.exists():
-            try: temp_output_txt_path.unlink()
-            except OSError as oe: logger.error(f"Error deleting temp transcript file {temp_output_txt_path} on error: {oe}")
+        try: temp_output_txt_path.unlink()
+        except FileNotFoundError: pass
+        except OSError as oe: logger.error(f"Error deleting temp transcript file {temp_output_txt_path} on error: {oe}")
         return False
 
-def transcribe_audio(model, audio_path: Path, output_txt_path: Path):
+def transcribe_audio_whisper_cpp(model, audio_path: Path, final_output_txt_path: Path, audio=None):
+    temp_output_txt_path = final_output_txt_path.parent / (final_output_txt_path.name + '.processing')
+    try:
+        logger.info(f"[whisper.cpp] Starting transcription for: {audio_path} -> {temp_output_txt_path}")
+        segments = model.transcribe(audio if audio is not None else load_audio(audio_path))
+
+        with open(temp_output_txt_path, 'w', encoding='utf-8', buffering=TRANSCRIPT_BUFFER_SIZE, newline='\n') as f:
+            # whisper.cpp timestamps are in units of 10 ms
+            segment_count = _write_segments(
+                f,
+                ((segment.t0 / 100.0, segment.t1 / 100.0, segment.text) for segment in segments),
+                "[whisper.cpp] Segment"
+            )
+            f.flush()
+            os.fsync(f.fileno()) # Make the rename below publish a complete file even after a crash
+        os.replace(temp_output_txt_path, final_output_txt_path) # Same directory, so a single atomic rename
+        logger.info(f"[whisper.cpp] Transcription with {segment_count} segments saved to {final_output_txt_path}")
+        return True
+    except Exception as e:
+        logger.error(f"[whisper.cpp] Failed to transcribe {audio_path}: {e}", exc_info=True)
+        try: temp_output_txt_path.unlink()
+        except FileNotFoundError: pass
+        except OSError as oe: logger.error(f"Error deleting temp transcript file {temp_output_txt_path} on error: {oe}")
+        return False
+
+_openai_model_offloaded = False # openai-whisper has no "loaded" flag; remember that we moved it off the GPU
+
+def unload_model_weights(model):
+    """Frees the model's weights from the device while keeping the model object; transcribe_audio reloads them on demand."""
+    global _openai_model_offloaded
+    try:
+        if config.TRANSCRIPTION_ENGINE == "faster-whisper":
+            if not model.model.model_is_loaded:
+                return
+            # On CUDA the weights are parked in host RAM, so the reload is a copy rather than a read from disk
+            model.model.unload_model(to_cpu=(config.DEVICE == "cuda"))
+        elif config.TRANSCRIPTION_ENGINE == "openai-whisper":
+            if model.device.type != "cuda":
+                return
+            model.cpu()
+            _openai_model_offloaded = True
+            import torch # Present whenever openai-whisper is
+            torch.cuda.empty_cache()
+        else:
+            return # whisper.cpp, or openai-whisper on CPU: nothing to release without reloading from disk
+        logger.info("Transcription model weights unloaded while idle.")
+    except Exception as e:
+        logger.warning(f"Could not unload transcription model weights: {e}")
+
+def _ensure_model_weights_loaded(model):
+    global _openai_model_offloaded
+    if config.TRANSCRIPTION_ENGINE == "faster-whisper":
+        if not model.model.model_is_loaded:
+            logger.info("Reloading transcription model weights.")
+            model.model.load_model()
+    elif config.TRANSCRIPTION_ENGINE == "openai-whisper" and _openai_model_offloaded:
+        logger.info("Reloading transcription model weights.")
+        model.to("cuda")
+        _openai_model_offloaded = False
+
+def transcribe_audio(model, audio_path: Path, output_txt_path: Path, audio=None):
+    """Transcribes audio_path to output_txt_path. audio may carry a load_audio() result decoded ahead of time."""
+    if config.IDLE_UNLOAD:
+        try:
+            _ensure_model_weights_loaded(model)
+        except Exception as e:
+            logger.error(f"Error reloading transcription model weights before transcribing {audio_path.name}: {e}", exc_info=True)
+            return False
     if config.TRANSCRIPTION_ENGINE == "faster-whisper":
-        return transcribe_audio_faster_whisper(model, audio_path, output_txt_path)
+        return transcribe_audio_faster_whisper(model, audio_path, output_txt_path, audio)
     elif config.TRANSCRIPTION_ENGINE == "openai-whisper":
-        return transcribe_audio_openai_whisper(model, audio_path, output_txt_path)
+        return transcribe_audio_openai_whisper(model, audio_path, output_txt_path, audio)
+    elif config.TRANSCRIPTION_ENGINE == "whisper.cpp":
+        return transcribe_audio_whisper_cpp(model, audio_path, output_txt_path, audio)
     else:
         logger.error(f"Unknown transcription engine '{config.TRANSCRIPTION_ENGINE}' in transcribe_audio call.")
         return False
\ No newline at end of file
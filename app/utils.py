@@ -1,22 +1,53 @@
 # app/utils.py
-import re
-from datetime import datetime, timezone, timedelta
+import functools
+import os
 
+# Deletes characters unsafe for filenames in one C-level str.translate pass
+_UNSAFE_FILENAME_CHARS_TABLE = str.maketrans('', '', '\\/*?:"<>|')
+
+@functools.lru_cache(maxsize=4096)
 def sanitize_filename(filename_str: str) -> str:
     """Removes or replaces characters unsafe for filenames from a string."""
-    sanitized = re.sub(r'[\\/*?:"<>|]', "", str(filename_str))
-    sanitized = re.sub(r'\s+', '_', sanitized)
-    return sanitized[:200] # Limit length
+    sanitized = str(filename_str).translate(_UNSAFE_FILENAME_CHARS_TABLE)
+    # Collapse each whitespace run (including leading/trailing ones) to a single underscore
+    words = sanitized.split()
+    if not words:
+        return "_" if sanitized else ""
+    collapsed = "_".join(words)
+    if sanitized[0].isspace():
+        collapsed = "_" + collapsed
+    if sanitized[-1].isspace():
+        collapsed += "_"
+    return collapsed[:200] # Limit length
 
 def format_timestamp(seconds: float) -> str:
     """Converts seconds to HH:MM:SS.mmm format."""
-    assert seconds >= 0, "non-negative timestamp expected"
     milliseconds = round(seconds * 1000.0)
-    
-    td = timedelta(milliseconds=milliseconds)
-    
-    hours, remainder = divmod(td.seconds, 3600)
-    minutes, secs = divmod(remainder, 60)
-    millisecs = td.microseconds // 1000 # Extract milliseconds part from microseconds
 
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millisecs:03d}"
\ No newline at end of file
+    # Plain integer divmods; no timedelta allocation per call
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, millisecs = divmod(milliseconds, 1000)
+
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millisecs:03d}"
+
+def list_filenames(directory) -> set:
+    """Returns the names of all entries in directory from a single scandir, or an empty set if it does not exist."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
+
+def drop_page_cache(path) -> None:
+    """Hints the kernel to evict path's cached pages once nothing will read it again. No-op where unsupported."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
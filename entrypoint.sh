@@ -8,12 +8,25 @@ VENV_PATH="$PERSISTENT_DATA_DIR_MOUNT/venv"
 MODEL_CACHE_ROOT="$PERSISTENT_DATA_DIR_MOUNT/models"
 FASTER_WHISPER_CACHE_DIR="$MODEL_CACHE_ROOT/faster_whisper_models"
 OPENAI_WHISPER_CACHE_DIR="$MODEL_CACHE_ROOT/openai_whisper_models"
+WHISPER_CPP_CACHE_DIR_PATH="$MODEL_CACHE_ROOT/whisper_cpp_models"
 
 PYTHON_FROM_VENV="$VENV_PATH/bin/python"
 PIP_FROM_VENV="$VENV_PATH/bin/pip"
 
 DESIRED_ENGINE="${TRANSCRIPTION_ENGINE:-faster-whisper}"
-DESIRED_DEVICE="${DEVICE:-cpu}"
+DESIRED_DEVICE="${DEVICE:-auto}"
+# "auto" picks CUDA when a GPU is passed through to the container (whisper.cpp is CPU-only here)
+if [ "$DESIRED_DEVICE" = "auto" ]; then
+    if [ "$DESIRED_ENGINE" != "whisper.cpp" ] && command -v nvidia-smi &> /dev/null && nvidia-smi -L &> /dev/null; then
+        DESIRED_DEVICE="cuda"
+    else
+        DESIRED_DEVICE="cpu"
+    fi
+elif [ "$DESIRED_DEVICE" = "cuda" ] && ! { command -v nvidia-smi &> /dev/null && nvidia-smi -L &> /dev/null; }; then
+    echo "Warning: DEVICE=cuda requested, but nvidia-smi not found or no GPU detected. Falling back to CPU." >&2
+    DESIRED_DEVICE="cpu"
+fi
+export DEVICE="$DESIRED_DEVICE"
 
 PYTORCH_VARIANT_FILE="$VENV_PATH/.pytorch_variant"
 
@@ -43,6 +56,7 @@ echo "Creating persistent directory structure (as root)..."
 mkdir -p "$VENV_PATH" \
            "$OPENAI_WHISPER_CACHE_DIR" \
            "$FASTER_WHISPER_CACHE_DIR" \
+           "$WHISPER_CPP_CACHE_DIR_PATH" \
            "$MODEL_CACHE_ROOT" # Ensure parent model dir exists
 
 echo "Attempting to set ownership of $PERSISTENT_DATA_DIR_MOUNT to ${TARGET_PUID}:${TARGET_PGID}..."
@@ -116,16 +130,35 @@ if [ "$DESIRED_ENGINE" = "faster-whisper" ]; then
     echo "Faster-Whisper engine selected."
     echo "Ensuring faster-whisper is installed..."
     "$PIP_FROM_VENV" install --no-cache-dir "faster-whisper"
+    if [ "$DESIRED_DEVICE" = "cuda" ]; then
+        # CTranslate2 loads cuBLAS 12 and cuDNN 9 at runtime; the slim base image ships neither
+        echo "Ensuring CUDA runtime libraries (cuBLAS 12, cuDNN 9) are installed..."
+        "$PIP_FROM_VENV" install --no-cache-dir nvidia-cublas-cu12 "nvidia-cudnn-cu12==9.*"
+        CUDA_LIB_DIRS=$("$PYTHON_FROM_VENV" -c 'import nvidia.cublas.lib, nvidia.cudnn.lib; print(list(nvidia.cublas.lib.__path__)[0] + ":" + list(nvidia.cudnn.lib.__path__)[0])') \
+            || echo "Warning: Could not locate pip-installed CUDA libraries. CTranslate2 will rely on system libraries." >&2
+        if [ -n "$CUDA_LIB_DIRS" ]; then
+            export LD_LIBRARY_PATH="$CUDA_LIB_DIRS${LD_LIBRARY_PATH:+:$LD_LIBRARY_PATH}"
+            echo "  CUDA library path: $CUDA_LIB_DIRS"
+        fi
+    fi
+fi
+
+if [ "$DESIRED_ENGINE" = "whisper.cpp" ]; then
+    echo "whisper.cpp engine selected."
+    echo "Ensuring pywhispercpp is installed..."
+    "$PIP_FROM_VENV" install --no-cache-dir pywhispercpp
 fi
 
 # --- Set ENV VARS for Python app to find model caches ---
 export WHISPER_OPENAI_CACHE_DIR="$OPENAI_WHISPER_CACHE_DIR"
 export WHISPER_FASTER_CACHE_DIR="$FASTER_WHISPER_CACHE_DIR"
+export WHISPER_CPP_CACHE_DIR="$WHISPER_CPP_CACHE_DIR_PATH"
 export XDG_CACHE_HOME="$MODEL_CACHE_ROOT" # General cache home for Hugging Face libs
 
 echo "Python environment setup complete. Model caches configured:"
 echo "  OpenAI Whisper Cache Dir: $WHISPER_OPENAI_CACHE_DIR"
 echo "  Faster Whisper Cache Dir: $WHISPER_FASTER_CACHE_DIR"
+echo "  whisper.cpp Cache Dir: $WHISPER_CPP_CACHE_DIR"
 echo "  XDG_CACHE_HOME: $XDG_CACHE_HOME"
 
 # --- User/Group final adjustments (Original gosu logic) ---